@@ -1,4 +1,7 @@
-from  fastapi import FastAPI,APIRouter
+from  fastapi import FastAPI,APIRouter, status
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 from src.auth import routes as auth_route
 from src.notes import routes as notes_route
@@ -11,8 +14,18 @@ from src.dashboard import create_user as dashboard_route
 from src.user import routes as user_route
 from src.core_search import routes as search_route
 from src.view_article import routes as view_article_route
+from src.resources import resources
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize in the background so the worker serves (and reports not
+    # ready) while models load; anything still missing is built on first use.
+    app.state.startup_task = asyncio.create_task(asyncio.to_thread(resources.startup))
+    yield
+    app.state.startup_task.cancel()
+    resources.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -30,6 +43,22 @@ app.include_router(history_route.router,prefix="/history")
 app.include_router(search_route.router,prefix="/core_search")
 app.include_router(view_article_route.router,prefix="/view_article")
 
+@app.get("/health/live")
+async def live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def ready():
+    if not resources.ready and app.state.startup_task.done():
+        # a resource failed (e.g. Milvus was down); try the startup again
+        app.state.startup_task = asyncio.create_task(asyncio.to_thread(resources.startup))
+    content = resources.status()
+    content["warmup"] = resources.values.get("warmup")
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if resources.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=content,
+    )
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
 
@@ -0,0 +1,99 @@
+# Offline recall-vs-latency benchmark for choosing settings.search_profiles.
+#
+#   python -m src.core_search.benchmark --terms terms.txt [--profiles candidates.json]
+#
+# Every profile is compared against a near-exhaustive reference search of the
+# same collection; recall@k is the share of the reference top-k it returns.
+import argparse
+import json
+import statistics
+import time
+
+from src.settings import settings
+from src.core_search import utils
+
+
+def recall_at_k(reference_ids, candidate_ids, k):
+    reference = set(reference_ids[:k])
+    if not reference:
+        return 1.0
+    return len(reference & set(candidate_ids[:k])) / len(reference)
+
+
+def run_profile(collection, embeddings, profile, repeats):
+    latencies, ids = [], []
+    for embedding in embeddings:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            res = utils.search_milvus(collection, embedding[None, :], profile)
+            latencies.append(time.perf_counter() - start)
+        ids.append(list(res[0].ids))
+    return latencies, ids
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def benchmark(terms, candidates, reference, k, repeats):
+    embeddings = utils.get_sbert_model().encode([utils.normalize_term(term) for term in terms])
+    report = []
+    for collection in utils.get_collections():
+        reference_profile = dict(utils.search_profile(collection, settings.search_default_mode), **reference)
+        reference_profile["limit"] = k
+        _, reference_ids = run_profile(collection, embeddings, reference_profile, 1)
+        for name, overrides in candidates.items():
+            profile = utils.search_profile(collection, overrides.get("mode", settings.search_default_mode))
+            profile.update(overrides.get("default", {}))
+            profile.update(overrides.get(str(collection.name), {}))
+            latencies, ids = run_profile(collection, embeddings, profile, repeats)
+            report.append({
+                "collection": collection.name,
+                "profile": name,
+                "params": profile.get("params"),
+                "limit": profile.get("limit"),
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "recall_at_k": statistics.mean(
+                    recall_at_k(expected, found, k) for expected, found in zip(reference_ids, ids)
+                ),
+            })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of core_search search profiles")
+    parser.add_argument("--terms", required=True, help="file with one search term per line")
+    parser.add_argument(
+        "--profiles",
+        help='JSON file {name: {"mode": ..., "default": {...}, "<collection>": {...}}}; '
+             "defaults to the modes in settings.search_profiles",
+    )
+    parser.add_argument(
+        "--reference", default='{"params": {"nprobe": 1024, "ef": 1024}}',
+        help="search profile overrides used as ground truth",
+    )
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.terms) as f:
+        terms = [line.strip() for line in f if line.strip()]
+    if args.profiles:
+        with open(args.profiles) as f:
+            candidates = json.load(f)
+    else:
+        candidates = {mode: {"mode": mode} for mode in settings.search_profiles}
+
+    report = benchmark(terms, candidates, json.loads(args.reference), args.k, args.repeats)
+    print(f"{'collection':<22}{'profile':<14}{'p50 ms':>10}{'p95 ms':>10}{'recall@' + str(args.k):>12}  params")
+    for row in report:
+        print(
+            f"{row['collection']:<22}{row['profile']:<14}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['recall_at_k']:>12.3f}  {json.dumps(row['params'])} limit={row['limit']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
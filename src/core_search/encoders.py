@@ -0,0 +1,162 @@
+# Query encoder backends. Both expose encode(sentences) -> float32 array of
+# L2-normalized embeddings, matching SentenceTransformer.encode for
+# all-MiniLM-L6-v2 (BERT, mean pooling, normalize).
+#
+# Check that a backend agrees with the reference PyTorch encoder before
+# switching settings.encoder_backend:
+#
+#   python -m src.core_search.encoders --sentences terms.txt --threshold 0.99
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+
+class TorchEncoder:
+    def __init__(self, model_name, threads=0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, sentences):
+        return self.model.encode(list(sentences))
+
+
+class OnnxEncoder:
+    def __init__(self, model_name, model_file, threads=0, max_length=256):
+        import onnxruntime
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.tokenizer = AutoTokenizer.from_pretrained(repo_id)
+        self.max_length = max_length
+        path = model_file if os.path.exists(model_file) else hf_hub_download(repo_id, model_file)
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def encode(self, sentences):
+        tokens = self.tokenizer(
+            list(sentences), padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        hidden = self.session.run(None, inputs)[0]
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return (pooled / norms).astype(np.float32)
+
+
+class MicroBatcher:
+    # Collects sentences from concurrent requests for up to max_wait seconds
+    # (or until max_batch are queued) and encodes them in forward passes of at
+    # most max_batch on the executor; each caller awaits futures for its own
+    # vectors.
+    def __init__(self, encode, executor, max_wait=0.002, max_batch=64):
+        self.encode_batch = encode
+        self.executor = executor
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.pending = []
+        self.flush_handle = None
+        self.tasks = set()
+
+    async def encode(self, sentences):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for sentence in sentences:
+            future = loop.create_future()
+            self.pending.append((sentence, future))
+            futures.append(future)
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_wait, self.flush)
+        return await asyncio.gather(*futures)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(pending), self.max_batch):
+            task = loop.create_task(self.run(pending[start:start + self.max_batch]))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, batch):
+        sentences = list(dict.fromkeys(sentence for sentence, _ in batch))
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(self.executor, self.encode_batch, sentences)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        vectors = dict(zip(sentences, vectors))
+        for sentence, future in batch:
+            if not future.done():
+                future.set_result(vectors[sentence])
+
+
+def load_encoder(backend, model_name, threads=0, onnx_file=None):
+    if backend == "onnx":
+        return OnnxEncoder(model_name, onnx_file, threads)
+    if backend == "torch":
+        return TorchEncoder(model_name, threads)
+    raise ValueError(f"Unknown encoder backend {backend!r}")
+
+
+def agreement(reference, candidate, sentences):
+    expected = np.asarray(reference.encode(sentences), dtype=np.float64)
+    actual = np.asarray(candidate.encode(sentences), dtype=np.float64)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    actual /= np.linalg.norm(actual, axis=1, keepdims=True)
+    return (expected * actual).sum(axis=1)
+
+
+def main():
+    from src.settings import settings
+
+    parser = argparse.ArgumentParser(description="Compare an encoder backend with the PyTorch reference")
+    parser.add_argument("--sentences", required=True, help="file with one query per line")
+    parser.add_argument("--backend", default="onnx")
+    parser.add_argument("--onnx-file", default=settings.encoder_onnx_file)
+    parser.add_argument("--threads", type=int, default=settings.encoder_threads)
+    parser.add_argument("--threshold", type=float, default=0.99)
+    args = parser.parse_args()
+
+    with open(args.sentences) as f:
+        sentences = [line.strip() for line in f if line.strip()]
+    reference = TorchEncoder(settings.encoder_model, args.threads)
+    candidate = load_encoder(args.backend, settings.encoder_model, args.threads, args.onnx_file)
+
+    for name, encoder in (("torch", reference), (args.backend, candidate)):
+        encoder.encode(sentences[:8])
+        start = time.perf_counter()
+        for sentence in sentences:
+            encoder.encode([sentence])
+        print(f"{name}: {(time.perf_counter() - start) / len(sentences) * 1000:.2f} ms per query")
+
+    cosine = agreement(reference, candidate, sentences)
+    print(f"cosine agreement: min {cosine.min():.4f}, mean {cosine.mean():.4f} over {len(sentences)} queries")
+    if cosine.min() < args.threshold:
+        print(f"FAIL: below threshold {args.threshold}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
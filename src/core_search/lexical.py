@@ -0,0 +1,210 @@
+# Local BM25 index over article_title + abstract_content, one per collection.
+#
+# An index directory holds immutable segments (seg-000001, seg-000002, ...).
+# Each segment stores its postings as flat .npy arrays that are memory-mapped,
+# so only the vocabulary is held in RAM. New documents are added by writing a
+# new segment; when a document id appears in several segments only the newest
+# copy is searched and counted in the BM25 statistics.
+#
+#   python -m src.core_search.lexical --collection vector_data_pmc [--expr "pmid > 39000000"]
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+token_pattern = re.compile(r"\w+(?:[.\-]\w+)*")
+
+
+def tokenize(text):
+    # keeps identifiers such as "brca1" and "c.68_69delag" as single tokens
+    return token_pattern.findall(text.lower()) if text else []
+
+
+def document_text(document):
+    parts = []
+    for field_name in ("article_title", "abstract_content"):
+        value = document.get(field_name)
+        if value:
+            parts.append(value if isinstance(value, str) else json.dumps(value))
+    return "\n".join(parts)
+
+
+class Segment:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "terms.json")) as f:
+            # term -> [start, stop) into the postings arrays
+            self.terms = json.load(f)
+        self.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(path, "doc_lengths.npy"), mmap_mode="r")
+        self.postings_docs = np.load(os.path.join(path, "postings_docs.npy"), mmap_mode="r")
+        self.postings_tfs = np.load(os.path.join(path, "postings_tfs.npy"), mmap_mode="r")
+        # mask of the documents not re-added in a newer segment, set by
+        # LexicalIndex.reload(); None while every document is live
+        self.live = None
+
+    def postings(self, term):
+        span = self.terms.get(term)
+        if span is None:
+            return None
+        docs, tfs = self.postings_docs[span[0]:span[1]], self.postings_tfs[span[0]:span[1]]
+        if self.live is not None:
+            keep = self.live[docs]
+            docs, tfs = docs[keep], tfs[keep]
+        return docs, tfs
+
+    def live_count(self):
+        return len(self.doc_ids) if self.live is None else int(np.count_nonzero(self.live))
+
+    def live_length(self):
+        lengths = self.doc_lengths if self.live is None else self.doc_lengths[self.live]
+        return int(lengths.sum())
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+
+def write_segment(path, documents):
+    postings = {}
+    doc_ids, doc_lengths = [], []
+    for doc_index, (doc_id, text) in enumerate(documents):
+        tokens = tokenize(text)
+        doc_ids.append(doc_id)
+        doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((doc_index, tf))
+
+    terms, docs_column, tfs_column = {}, [], []
+    for term, entries in postings.items():
+        start = len(docs_column)
+        docs_column.extend(doc_index for doc_index, _ in entries)
+        tfs_column.extend(tf for _, tf in entries)
+        terms[term] = [start, len(docs_column)]
+
+    # write next to the final path and rename, so readers never see a
+    # half-written segment
+    tmp_path = path + ".tmp"
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "doc_ids.npy"), np.array(doc_ids, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "doc_lengths.npy"), np.array(doc_lengths, dtype=np.int32))
+    np.save(os.path.join(tmp_path, "postings_docs.npy"), np.array(docs_column, dtype=np.int32))
+    np.save(os.path.join(tmp_path, "postings_tfs.npy"), np.array(tfs_column, dtype=np.int32))
+    with open(os.path.join(tmp_path, "terms.json"), "w") as f:
+        json.dump(terms, f)
+    os.replace(tmp_path, path)
+
+
+class LexicalIndex:
+    def __init__(self, path, k1=1.2, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.segments = []
+        self.reload()
+
+    def reload(self):
+        names = []
+        if os.path.isdir(self.path):
+            names = sorted(
+                name for name in os.listdir(self.path) if name.startswith("seg-") and not name.endswith(".tmp")
+            )
+        loaded = {segment.path: segment for segment in self.segments}
+        paths = [os.path.join(self.path, name) for name in names]
+        self.segments = [loaded.get(path) or Segment(path) for path in paths]
+        # a document re-added in a newer segment only counts in the newest one
+        seen = np.empty(0, dtype=np.int64)
+        for segment in reversed(self.segments):
+            superseded = np.isin(segment.doc_ids, seen)
+            segment.live = ~superseded if superseded.any() else None
+            seen = np.union1d(seen, segment.doc_ids)
+        self.total_docs = sum(segment.live_count() for segment in self.segments)
+        total_length = sum(segment.live_length() for segment in self.segments)
+        self.avg_length = total_length / self.total_docs if self.total_docs else 0.0
+
+    def add_documents(self, documents):
+        os.makedirs(self.path, exist_ok=True)
+        number = int(self.segments[-1].path.rsplit("-", 1)[1]) + 1 if self.segments else 1
+        write_segment(os.path.join(self.path, f"seg-{number:06d}"), documents)
+        self.reload()
+
+    def search(self, text, limit=100):
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms or not self.total_docs:
+            return []
+        segment_postings = [{term: segment.postings(term) for term in terms} for segment in self.segments]
+        idfs = {}
+        for term in terms:
+            df = sum(len(postings[term][0]) for postings in segment_postings if postings[term] is not None)
+            if df:
+                idfs[term] = math.log(1 + (self.total_docs - df + 0.5) / (df + 0.5))
+
+        best = {}
+        for segment, term_postings in zip(self.segments, segment_postings):
+            # score only the documents in the query's posting lists, so the
+            # cost follows posting length rather than segment size
+            docs_columns, scores_columns = [], []
+            for term, idf in idfs.items():
+                postings = term_postings[term]
+                if postings is None:
+                    continue
+                docs, tfs = postings
+                tfs = np.asarray(tfs, dtype=np.float32)
+                norms = self.k1 * (1 - self.b + self.b * segment.doc_lengths[docs] / self.avg_length)
+                docs_columns.append(np.asarray(docs))
+                scores_columns.append(idf * tfs * (self.k1 + 1) / (tfs + norms))
+            if not docs_columns:
+                continue
+            docs, positions = np.unique(np.concatenate(docs_columns), return_inverse=True)
+            scores = np.bincount(positions, weights=np.concatenate(scores_columns), minlength=len(docs))
+            candidates = np.arange(len(docs))
+            if len(candidates) > limit:
+                candidates = np.argpartition(-scores, limit)[:limit]
+            for candidate in candidates:
+                best[int(segment.doc_ids[docs[candidate]])] = float(scores[candidate])
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def __len__(self):
+        return self.total_docs
+
+
+def main():
+    from pymilvus import Collection, connections
+    from src.settings import settings
+
+    parser = argparse.ArgumentParser(description="Build or extend the lexical index of a collection")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--expr", default="", help="Milvus filter selecting the documents to add")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--segment-size", type=int, default=200000)
+    args = parser.parse_args()
+
+    connections.connect(host=settings.ip, port="19530")
+    collection = Collection(name=args.collection)
+    primary_field = collection.primary_field.name
+    index = LexicalIndex(os.path.join(settings.lexical_index_dir, args.collection))
+    iterator = collection.query_iterator(
+        batch_size=args.batch_size,
+        expr=args.expr,
+        output_fields=[primary_field, "article_title", "abstract_content"],
+    )
+
+    documents = []
+    while True:
+        batch = iterator.next()
+        if batch:
+            documents.extend((row[primary_field], document_text(row)) for row in batch)
+        if documents and (not batch or len(documents) >= args.segment_size):
+            index.add_documents(documents)
+            print(f"Indexed {len(documents)} documents, {len(index)} total")
+            documents = []
+        if not batch:
+            break
+    iterator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class AnnotateRequest(BaseModel):
     pubmed: Optional[List[int]] = None
     biorxiv: Optional[List[int]] = None
     plos: Optional[List[int]] = None
+
+class BatchSearchRequest(BaseModel):
+    terms: List[str]
+    article_type: Optional[str] = None
+    date_filter: Optional[str] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+    source: Optional[str] = None
+    mode: Optional[str] = None
+    hybrid: bool = False
+    rerank: bool = False
+    limit: int = Field(20, ge=1, le=300)
+    view: str = Field("full", pattern="^(full|summary)$")
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 publication_categories = {
     "Books and Documents": [
         "Address",
@@ -81,4 +83,14 @@ publication_categories = {
         "Randomized Controlled Trial",
         "Randomized Controlled Trial, Veterinary"
     ]
-}
\ No newline at end of file
+}
+
+# publication_type -> categories it belongs to, so filters are a set lookup
+# per type instead of a scan over every category list.
+publication_type_categories = MappingProxyType({
+    publication_type: frozenset(
+        category for category, types in publication_categories.items() if publication_type in types
+    )
+    for types in publication_categories.values()
+    for publication_type in types
+})
@@ -0,0 +1,155 @@
+import heapq
+from itertools import islice
+
+import numpy as np
+
+
+def rescale_scores(distances):
+    # cosine similarity in [-1, 1] -> percentage
+    return (np.asarray(distances, dtype=np.float64) + 1) / 2 * 100
+
+
+def normalize_scores(scores, method="none"):
+    if method == "minmax" and len(scores):
+        low, high = scores.min(), scores.max()
+        if high > low:
+            return (scores - low) / (high - low) * 100
+        return np.full(len(scores), 100.0)
+    return scores
+
+
+def to_json_value(value):
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    return list(value)
+
+
+def value_size(value):
+    # approximate payload bytes of a column value: characters of text, 8 per number
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + value_size(item) for key, item in value.items())
+    try:
+        return sum(value_size(item) for item in value)
+    except TypeError:
+        return 8
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return fused
+
+
+class CollectionHits:
+    def __init__(self, ids, columns, scores, ranking=None):
+        self.ids = ids
+        self.columns = columns
+        self.scores = scores
+        # what RankedResults orders by; the similarity score unless fused
+        self.ranking = scores if ranking is None else ranking
+
+    @classmethod
+    def from_hits(cls, hits, output_fields):
+        columns = {field_name: [hit.entity.get(field_name) for hit in hits] for field_name in output_fields}
+        return cls(list(hits.ids), with_source(columns, len(hits)), rescale_scores(hits.distances))
+
+    @classmethod
+    def from_rows(cls, rows, primary_field, output_fields, query_embedding):
+        columns = {field_name: [row.get(field_name) for row in rows] for field_name in output_fields}
+        vectors = np.asarray([row["vector_data"] for row in rows], dtype=np.float64).reshape(len(rows), -1)
+        query = np.asarray(query_embedding, dtype=np.float64).ravel()
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        cosine = vectors @ query / np.where(norms == 0, 1, norms)
+        return cls([row[primary_field] for row in rows], with_source(columns, len(rows)), rescale_scores(cosine))
+
+    def take(self, indices):
+        columns = {field_name: [values[i] for i in indices] for field_name, values in self.columns.items()}
+        ranking = None if self.ranking is self.scores else self.ranking[indices]
+        return CollectionHits([self.ids[i] for i in indices], columns, self.scores[indices], ranking)
+
+    def select(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def concat(self, other):
+        columns = {
+            field_name: values + other.columns.get(field_name, [None] * len(other))
+            for field_name, values in self.columns.items()
+        }
+        return CollectionHits(self.ids + other.ids, columns, np.concatenate([self.scores, other.scores]))
+
+    def row(self, index):
+        article = {"similarity_score": float(self.scores[index])}
+        for field_name, values in self.columns.items():
+            article[field_name] = to_json_value(values[index])
+        return article
+
+    @property
+    def nbytes(self):
+        ranking = 0 if self.ranking is self.scores else self.ranking.nbytes
+        return self.scores.nbytes + ranking + sum(
+            value_size(value) for values in self.columns.values() for value in values
+        )
+
+    def __len__(self):
+        return len(self.scores)
+
+
+def with_source(columns, count):
+    if "pmid" in columns and "source" not in columns:
+        columns["source"] = ["pubmed"] * count
+    return columns
+
+
+class RankedResults:
+    # Every part is already sorted by its ranking (Milvus returns hits best first,
+    # fusion re-sorts, and filtering keeps that order), so a k-way merge yields the global ranking
+    # lazily and only as far as the pages requested so far.
+    def __init__(self, parts, normalization="none", skipped=()):
+        self.parts = [part for part in parts if len(part)]
+        # collections left out because their search failed or timed out
+        self.skipped = list(skipped)
+        self.total = sum(len(part) for part in self.parts)
+        self.order = []
+        self._merged = heapq.merge(
+            *[
+                zip(normalize_scores(part.ranking, normalization).tolist(), [part_index] * len(part), range(len(part)))
+                for part_index, part in enumerate(self.parts)
+            ],
+            key=lambda entry: entry[0],
+            reverse=True,
+        )
+
+    def _fill(self, count):
+        needed = count - len(self.order)
+        if needed > 0:
+            self.order.extend((part_index, row_index) for _, part_index, row_index in islice(self._merged, needed))
+
+    def reorder_head(self, positions):
+        # positions is a permutation of range(len(positions)) giving the new
+        # order of the first len(positions) results
+        self._fill(len(positions))
+        head = [self.order[position] for position in positions]
+        self.order[:len(head)] = head
+
+    def article(self, position):
+        self._fill(position + 1)
+        part_index, row_index = self.order[position]
+        return self.parts[part_index].row(row_index)
+
+    def slice(self, start, stop):
+        stop = min(stop, len(self))
+        self._fill(stop)
+        return [self.parts[part_index].row(row_index) for part_index, row_index in self.order[start:stop]]
+
+    @property
+    def nbytes(self):
+        return sum(part.nbytes for part in self.parts)
+
+    def __len__(self):
+        return self.total
@@ -1,15 +1,40 @@
+import json
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from fastapi.middleware.cors import CORSMiddleware
 from src.core_search import utils
-from fastapi import APIRouter, Depends, HTTPException, status
-from sentence_transformers import SentenceTransformer
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from src.core_search.models import *
+from src.settings import settings
+from src.auth.utils import get_current_user
 
 router = APIRouter()
 
+def check_mode(mode):
+    if mode is not None and mode not in settings.search_profiles:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"mode must be one of {sorted(settings.search_profiles)}",
+        )
+
+def check_dates(filters):
+    if not filters.get("date_filter"):
+        return
+    try:
+        from_date, to_date = utils.date_window(filters)
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date and to_date must be given as DD-MM-YYYY",
+        )
+    if from_date > to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date must not be after to_date",
+        )
+
 @router.get("/")
 async def get_results(
         request: Request,
@@ -18,13 +43,104 @@ async def get_results(
         date_filter: Optional[str] = None,
         from_date: Optional[str] = None,
         to_date: Optional[str] = None,
-        source: Optional[str] = None
+        source: Optional[str] = None,
+        mode: Optional[str] = None,
+        hybrid: bool = False,
+        rerank: bool = False,
+        limit: int = Query(settings.search_page_size, ge=1, le=300),
+        cursor: Optional[str] = None,
+        view: str = Query("full", pattern="^(full|summary)$")
+    ):
+    check_mode(mode)
+    check_dates(request.query_params)
+
+    filters = {**request.query_params, "hybrid": hybrid, "rerank": rerank}
+    response = await utils.get_data(filters)
+    try:
+        articles, next_cursor = utils.paginate(response, limit, cursor, view)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "articles": articles,
+            "total": len(response),
+            "next_cursor": next_cursor,
+            "skipped_collections": response.skipped,
+        }
+    )
+
+@router.get("/stream")
+async def stream_results(
+        request: Request,
+        term: str,
+        article_type: Optional[str] = None,
+        date_filter: Optional[str] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        source: Optional[str] = None,
+        mode: Optional[str] = None,
+        view: str = Query("full", pattern="^(full|summary)$")
     ):
+    check_mode(mode)
+    check_dates(request.query_params)
+
+    async def stream_response():
+        # streaming ranks by vector similarity only
+        filters = {**request.query_params, "hybrid": False, "rerank": False}
+        async for article in utils.stream_data(filters):
+            if view == "summary":
+                article = utils.article_summary(article)
+            yield (json.dumps(article) + "\n").encode("utf-8")
+
+    return StreamingResponse(stream_response(), media_type="application/x-ndjson")
+
+@router.post("/batch")
+async def get_batch_results(request: BatchSearchRequest):
+    if not request.terms or len(request.terms) > settings.batch_search_max_terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"terms must contain between 1 and {settings.batch_search_max_terms} entries",
+        )
+    check_mode(request.mode)
+
+    filters = request.model_dump(include=set(utils.search_filter_keys) | {"mode", "hybrid", "rerank"})
+    check_dates(filters)
+    responses = await utils.get_batch_data(request.terms, filters)
 
-    response = utils.get_data(request.query_params)
+    results = []
+    for term, response in zip(request.terms, responses):
+        articles, next_cursor = utils.paginate(response, request.limit, view=request.view)
+        results.append(
+            {
+                "term": term,
+                "articles": articles,
+                "total": len(response),
+                "next_cursor": next_cursor,
+                "skipped_collections": response.skipped,
+            }
+        )
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content={"results": results}
+    )
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "embeddings": utils.embedding_cache.stats(),
+            "results": utils.search_cache.stats(),
+        },
+    )
 
+@router.post("/cache/invalidate")
+async def invalidate_cache(current_user: dict = Depends(get_current_user)):
+    invalidated = utils.invalidate_search_cache()
     return JSONResponse(
-        status_code=status.HTTP_200_OK, content={"articles": list(response)}
+        status_code=status.HTTP_200_OK, content={"status": "success", "invalidated": invalidated}
     )
 
 @router.post("/annotate")
@@ -1,27 +1,77 @@
 import asyncio
-from datetime import datetime, timedelta
+import heapq
+import itertools
+from datetime import date, datetime, timedelta
+from functools import lru_cache, reduce
 import json
 import threading
 from concurrent.futures import ThreadPoolExecutor
-from sentence_transformers import SentenceTransformer
-from pymilvus import MilvusClient, Collection, connections, MilvusException
+import grpc
+from pymilvus.exceptions import ConnectError, MilvusUnavailableException
 import time
 import gc
+import numpy as np
 from src.settings import settings
-from src.core_search.publication_categories import publication_categories 
-import google.generativeai as genai
+from src.core_search.publication_categories import publication_categories, publication_type_categories
+from src.core_search.cache import LRUCache
+from src.core_search.results import CollectionHits, RankedResults, reciprocal_rank_fusion
+from src.core_search.lexical import LexicalIndex, document_text
+from src.core_search.encoders import MicroBatcher
+from src.resources import resources, collection_names, get_generative_model
+import os
 
-ip = settings.ip
-client = MilvusClient(uri="http://" + ip + ":19530")
-connections.connect(host=ip, port="19530")
+# Milvus, the collections, the encoder and Gemini come from the shared
+# resource registry and are only built on first use (or at app startup).
+source_collections = {
+    "pubmed": "vector_data_pmc",
+    "BioRxiv": "vector_data_biorxiv",
+    "Public Library of Science (PLOS)": "vector_data_plos",
+}
+
+def get_collections(names=collection_names):
+    return [resources.get(name) for name in names]
+
+def get_sbert_model():
+    return resources.get("sbert_model")
+
+# Encoding is CPU bound and searches block on gRPC, so both run off the event
+# loop on their own bounded pools instead of the default executor.
+encode_executor = ThreadPoolExecutor(max_workers=settings.encode_workers, thread_name_prefix="sbert-encode")
+encode_batcher = MicroBatcher(
+    lambda sentences: get_sbert_model().encode(sentences), encode_executor, settings.encode_batch_wait_ms / 1000, settings.encode_max_batch
+)
+search_executor = ThreadPoolExecutor(max_workers=settings.search_workers, thread_name_prefix="milvus-search")
+
+rerank_executor = ThreadPoolExecutor(max_workers=settings.rerank_workers, thread_name_prefix="rerank")
 
-vector_data_pmc = Collection(name="vector_data_pmc")
-vector_data_biorxiv = Collection(name="vector_data_biorxiv")
-vector_data_plos = Collection(name="vector_data_plos")
+def load_rerank_model():
+    # imported here so workers that never rerank do not load torch
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(settings.rerank_model)
 
-sbert_model = SentenceTransformer("all-MiniLM-L6-v2")
+resources.register("rerank_model", load_rerank_model, eager=False)
+warmup_terms = ["cancer immunotherapy", "BRCA1 mutation", "covid-19 vaccine efficacy", "gut microbiome"]
+
+embedding_cache = LRUCache(
+    max_entries=settings.embedding_cache_size,
+    max_bytes=settings.embedding_cache_bytes,
+    ttl=settings.embedding_cache_ttl,
+    sizeof=lambda embedding: embedding.nbytes,
+)
+search_cache = LRUCache(
+    max_entries=settings.search_cache_size,
+    max_bytes=settings.search_cache_bytes,
+    ttl=settings.search_cache_ttl,
+    sizeof=lambda articles: articles.nbytes,
+)
+search_filter_keys = ("article_type", "date_filter", "from_date", "to_date", "source")
+max_expr_years = 30
+epoch_ordinal = date(1970, 1, 1).toordinal()
+publication_months = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
 
-genai.configure(api_key=settings.gemini_api_key)
 generation_config = {
 "temperature": 0,
 "top_p": 0.95,
@@ -29,153 +79,534 @@ generation_config = {
 "max_output_tokens": 8192,
 "response_mime_type": "text/plain",
 }
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    generation_config=generation_config,
-    safety_settings="BLOCK_NONE",
-)
+def get_annotate_model():
+    return get_generative_model("gemini-1.5-flash", generation_config, safety_settings="BLOCK_NONE")
 fixed_prompt = "\n\n" +  "Dump all genes, proteins, diseases,gene ontology, mutation,cellular , variants into a json and also give the count of their occurence in the article.Give response only in json format. Format of json : {'gene': {'word': '<occurence_value>'},'protein' : {'word': '<occurence_value>'} }.Use the keywords 'gene','disesase','gene ontology','celluar','mutation','protein','variants' for json.If no terms are found related to these categories return an empty json "
 
-def search_milvus(collection, query_embedding):
-    field_names = {
-        "vector_data_pmc": [
-            "pmid", "pmc", "abstract_content", "publication_date",
-            "publication_type", "figures", "article_title"
-        ],
-        "vector_data_biorxiv": [
-            "bioRxiv_id", "source", "abstract_content", "publication_date",
-            "publication_type", "figures", "article_title"
-        ],
-        "vector_data_plos": [
-            "plos_id", "source", "abstract_content", "publication_date",
-            "publication_type", "figures", "article_title"
-        ],
-    }
+field_names = {
+    "vector_data_pmc": [
+        "pmid", "pmc", "abstract_content", "publication_date",
+        "publication_type", "figures", "article_title"
+    ],
+    "vector_data_biorxiv": [
+        "bioRxiv_id", "source", "abstract_content", "publication_date",
+        "publication_type", "figures", "article_title"
+    ],
+    "vector_data_plos": [
+        "plos_id", "source", "abstract_content", "publication_date",
+        "publication_type", "figures", "article_title"
+    ],
+}
+
+filter_fields = ("source", "publication_date", "publication_type")
+
+lexical_indexes = {}
+
+def get_lexical_index(collection_name):
+    if collection_name not in lexical_indexes:
+        path = os.path.join(settings.lexical_index_dir, collection_name)
+        lexical_indexes[collection_name] = LexicalIndex(path) if os.path.isdir(path) else None
+    return lexical_indexes[collection_name]
+
+def query_flag(filters, name):
+    # routes pass the booleans FastAPI parsed, never the raw query string
+    return bool(filters.get(name))
+
+def use_hybrid(filters):
+    return query_flag(filters, "hybrid")
+
+def fetch_rows(collection_name, ids, fields):
+    return resources.get("milvus").get(collection_name=collection_name, ids=ids, output_fields=fields)
+
+async def fuse_lexical(collection, profile, hits, term, query_embedding):
+    index = get_lexical_index(str(collection.name))
+    if not index:
+        # no lexical index yet: rank on the vector order alone, on the same
+        # RRF scale as the fused collections it is merged with
+        fused = reciprocal_rank_fusion([hits.ids], settings.rrf_k)
+        hits.ranking = np.array([fused[doc_id] for doc_id in hits.ids])
+        return hits
+    loop = asyncio.get_running_loop()
+    lexical = await loop.run_in_executor(search_executor, index.search, term, settings.lexical_search_limit)
+    lexical_ranking = [doc_id for doc_id, _ in lexical]
+
+    # Lexical matches the vector search missed are fetched with their vectors
+    # so they still get a real similarity_score.
+    vector_ranking = hits.ids
+    seen = set(vector_ranking)
+    missing = [doc_id for doc_id in lexical_ranking if doc_id not in seen]
+    if missing:
+        fields = output_fields(collection, profile)
+        rows = await loop.run_in_executor(
+            search_executor, fetch_rows, str(collection.name), missing, fields + ["vector_data"]
+        )
+        if rows:
+            extra = CollectionHits.from_rows(rows, collection.primary_field.name, fields, query_embedding)
+            hits = hits.concat(extra)
+
+    fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], settings.rrf_k)
+    hits.ranking = np.array([fused.get(doc_id, 0.0) for doc_id in hits.ids])
+    return hits.take(np.argsort(-hits.ranking, kind="stable"))
+
+def search_mode(filters):
+    return filters.get("mode") or settings.search_default_mode
+
+def search_profile(collection, mode):
+    # settings.search_profiles maps mode -> collection name -> search profile,
+    # with "default" holding the values shared by every collection.
+    profiles = settings.search_profiles[mode]
+    profile = dict(profiles.get("default", {}))
+    profile.update(profiles.get(str(collection.name), {}))
+    return profile
+
+def output_fields(collection, profile):
+    fields = list(profile.get("output_fields") or field_names[str(collection.name)])
+    # apply_filters needs these columns even if a profile trims the payload
+    fields += [
+        field_name for field_name in filter_fields
+        if field_name in field_names[str(collection.name)] and field_name not in fields
+    ]
+    return fields
+
+def warm_up():
+    # Runs at startup, before readiness: loads every collection into Milvus
+    # memory and pushes a few synthetic queries through the encoder and each
+    # collection so the first real searches do not pay the cold-start cost.
+    timings = {}
+    collections = get_collections()
+    for collection in collections:
+        start_time = time.perf_counter()
+        collection.load()
+        timings[f"load {collection.name}"] = time.perf_counter() - start_time
+
+    encoder = get_sbert_model()
+    start_time = time.perf_counter()
+    encoder.encode(warmup_terms[:1])
+    timings["first encode"] = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    query_embeddings = encoder.encode(warmup_terms)
+    timings["batch encode"] = time.perf_counter() - start_time
+
+    for collection in collections:
+        profile = search_profile(collection, settings.search_default_mode)
+        start_time = time.perf_counter()
+        search_milvus(collection, query_embeddings, profile, settings.search_timeout * 4)
+        timings[f"search {collection.name}"] = time.perf_counter() - start_time
+
+    if settings.rerank_warmup:
+        start_time = time.perf_counter()
+        score_pairs([(term, term) for term in warmup_terms])
+        timings["rerank model"] = time.perf_counter() - start_time
+
+    for step, seconds in timings.items():
+        print(f"Warm-up {step}: {seconds:.2f}s")
+    return timings
+
+if settings.warmup_enabled:
+    resources.register("warmup", warm_up)
+
+def search_milvus(collection, query_embedding, profile, timeout=None, expr=None, limit=None, offset=0):
+    kwargs = {}
+    if profile.get("consistency_level"):
+        kwargs["consistency_level"] = profile["consistency_level"]
     start_time = time.time()
     res = collection.search(
-        param={"metric_type": "COSINE", "params": {"nprobe": 10}},
+        param={
+            "metric_type": profile.get("metric_type", "COSINE"),
+            "offset": offset,
+            "params": profile.get("params", {}),
+        },
         data=query_embedding,
         anns_field="vector_data",
-        limit=100,
-        output_fields=field_names[str(collection.name)],
+        limit=limit or profile.get("limit", 100),
+        output_fields=output_fields(collection, profile),
+        expr=expr,
+        timeout=timeout,
+        **kwargs,
     )
     end_time = time.time()
     print(f"Time for {collection.name} search:", end_time - start_time)
     return res
 
+def date_window(filters):
+    current_date = datetime.now()
+    if filters['date_filter'] == "10 years":
+        from_date = current_date - timedelta(days=365 * 10)
+        to_date = current_date
+    elif filters['date_filter'] == "5 years":
+        from_date = current_date - timedelta(days=365 * 5)
+        to_date = current_date
+    elif filters['date_filter'] == "1 year":
+        from_date = current_date - timedelta(days=365)
+        to_date = current_date
+    else:
+        from_date = datetime.strptime(filters['from_date'], "%d-%m-%Y")
+        to_date = datetime.strptime(filters['to_date'], "%d-%m-%Y")
+    return from_date, to_date
 
-def hit_to_dict(hit):
-    hit_dict = {"similarity_score": hit.score}
-    field_names = [
-        "pmid", "pmc", "biorxiv_id", "plos_id", "source",
-        "body_content", "abstract_content", "publication_date",
-        "publication_type", "figures", "article_title"
-    ]
+@lru_cache(maxsize=65536)
+def publication_epoch_day(publication_date):
+    # "DD-Mon-YYYY" -> days since 1970-01-01, parsed once per distinct string
+    try:
+        day, month, year = publication_date.split("-")
+        return date(int(year), publication_months[month], int(day)).toordinal() - epoch_ordinal
+    except (AttributeError, KeyError, ValueError):
+        return None
 
-    for field_name in field_names:
-        try:
-            value = getattr(hit, field_name, None)
-            if not isinstance(value, (str, int, list, dict)):
-                hit_dict[field_name] = list(value)
-            else:
-                hit_dict[field_name] = value
-        except MilvusException:
-            continue
-    if "pmid" in hit_dict.keys():
-        hit_dict['source'] = "pubmed"
-    return hit_dict
-
-def apply_filters(articles, filters):
-    filtered_articles = articles
-    if filters.get('article_type'):
-        article_type_filtered_articles = []
-        if isinstance(filters.get('article_type'), str):
-            article_type = [filters['article_type']]
-        for article in articles:
-            for publication_type in article.get("publication_type"):
-                for filter in article_type:
-                    if publication_type in publication_categories[filter] and article not in article_type_filtered_articles:
-                        article_type_filtered_articles.append(article)                
-                        break
-        filtered_articles = article_type_filtered_articles            
-
-    if filters.get('source') :
-        source_filtered_articles  = []
-        for article in filtered_articles:
-            if article.get("source") == filters['source']:
-                source_filtered_articles.append(article)    
-        filtered_articles = source_filtered_articles
-                
+def epoch_day_window(filters):
+    from_date, to_date = date_window(filters)
+    return from_date.toordinal() - epoch_ordinal, to_date.toordinal() - epoch_ordinal
+
+def date_mask(publication_dates, window):
+    from_day, to_day = window
+    days = np.array(
+        [publication_epoch_day(publication_date) for publication_date in publication_dates],
+        dtype=np.float64,
+    )
+    # unparseable dates are NaN and fail both comparisons
+    return (days >= from_day) & (days <= to_day)
+
+def article_type_filters(filters):
+    return frozenset(
+        category.strip() for category in filters['article_type'].split(",") if category.strip()
+    )
+
+def collections_for_source(source):
+    if source in source_collections:
+        return get_collections([source_collections[source]])
+    return get_collections()
+
+def filter_publication_types(filters):
+    return sorted({
+        publication_type
+        for category in article_type_filters(filters)
+        for publication_type in publication_categories.get(category, [])
+    })
+
+def matches_nothing(filters):
+    # an article_type filter naming no known category cannot match any article
+    return bool(filters.get('article_type')) and not filter_publication_types(filters)
+
+def filter_expr(filters, window=None):
+    # Build a Milvus boolean expression so filtering happens inside the index
+    # search and every collection returns a full page of matching hits.
+    # apply_filters still runs afterwards as the exact check.
+    clauses = []
+    publication_types = filter_publication_types(filters) if filters.get('article_type') else None
+    if publication_types:
+        clauses.append(f"ARRAY_CONTAINS_ANY(publication_type, {json.dumps(publication_types)})")
     if filters.get('date_filter'):
-        current_date = datetime.now()
-        if filters['date_filter'] == "10 years":
-            from_date = current_date - timedelta(days=365 * 10)
-            to_date = current_date
-        elif filters['date_filter'] == "5 years":
-            from_date = current_date - timedelta(days=365 * 5)
-            to_date = current_date
-        elif filters['date_filter'] == "1 year":
-            from_date = current_date - timedelta(days=365)
-            to_date = current_date
-        else:
-            from_date = datetime.strptime(filters['from_date'], "%d-%m-%Y")
-            to_date = datetime.strptime(filters['to_date'], "%d-%m-%Y")
-        date_filtered_articles = []
-        for article in filtered_articles:
-            if from_date and to_date:
-                months = {
-                'Jan': "01",
-                'Feb': "02",
-                'Mar': "03",
-                'Apr': "04",
-                'May': "05",
-                'Jun': "06",
-                'Jul': "07",
-                'Aug': "08",
-                'Sep': "09",
-                'Oct': "10",
-                'Nov': "11",
-                'Dec': "12",
-            }      
-            pub_date = article.get('publication_date', None)
-            pub_date = pub_date.split("-")
-            pub_date = str(pub_date[0]) + "-" + str(months[pub_date[1]]) +"-"+ str(pub_date[2])
-
-            pub_date = datetime.strptime(pub_date, "%d-%m-%Y")
-            if (from_date <= pub_date <= to_date):
-                date_filtered_articles.append(article)
-        filtered_articles = date_filtered_articles
-
-    return filtered_articles
-
-def get_data(query_params):
-    query_embedding = sbert_model.encode([query_params.get("term")])
-
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        search_results = list(
-            executor.map(
-                lambda collection: search_milvus(collection, query_embedding),
-                [vector_data_pmc, vector_data_biorxiv, vector_data_plos],
+        # publication_date is stored as a "DD-Mon-YYYY" string, which Milvus
+        # cannot range-compare, so narrow by year and leave the day-level
+        # bounds to apply_filters.
+        from_day, to_day = window or epoch_day_window(filters)
+        years = range(
+            date.fromordinal(from_day + epoch_ordinal).year,
+            date.fromordinal(to_day + epoch_ordinal).year + 1,
+        )
+        if 0 < len(years) <= max_expr_years:
+            year_clauses = " or ".join(f'publication_date like "%-{year}"' for year in years)
+            clauses.append(f"({year_clauses})")
+    return " and ".join(clauses) or None
+
+def apply_filters(hits, filters, window=None):
+    mask = np.ones(len(hits), dtype=bool)
+    if filters.get('article_type'):
+        categories = article_type_filters(filters)
+        mask &= np.array([
+            any(
+                not categories.isdisjoint(publication_type_categories.get(publication_type, ()))
+                for publication_type in publication_types or ()
             )
+            for publication_types in hits.columns["publication_type"]
+        ], dtype=bool)
+
+    if filters.get('source'):
+        mask &= np.array([source == filters['source'] for source in hits.columns["source"]], dtype=bool)
+
+    if filters.get('date_filter'):
+        mask &= date_mask(hits.columns["publication_date"], window or epoch_day_window(filters))
+
+    return hits if mask.all() else hits.select(mask)
+
+def normalize_term(term):
+    # all-MiniLM-L6-v2 is uncased, so case and spacing do not change the embedding
+    return " ".join(str(term).lower().split())
+
+async def encode_terms(terms):
+    # terms are already normalized; encode every cache miss in one batch
+    embeddings = {term: embedding_cache.get(term) for term in dict.fromkeys(terms)}
+    missing = [term for term, embedding in embeddings.items() if embedding is None]
+    if missing:
+        encoded = await encode_batcher.encode(missing)
+        for term, embedding in zip(missing, encoded):
+            embeddings[term] = embedding
+            embedding_cache.put(term, embedding)
+    return np.vstack([embeddings[term] for term in terms])
+
+partial_search_codes = (grpc.StatusCode.DEADLINE_EXCEEDED, grpc.StatusCode.UNAVAILABLE)
+
+async def search_collection(collection, query_embedding, profile, expr=None, limit=None, offset=0):
+    loop = asyncio.get_running_loop()
+    # a batch search returns a result set per query vector, so it gets longer
+    timeout = settings.search_timeout + settings.search_timeout_per_query * (len(query_embedding) - 1)
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(
+                search_executor, search_milvus, collection, query_embedding, profile, timeout, expr, limit, offset
+            ),
+            timeout=timeout,
         )
+    except (asyncio.TimeoutError, ConnectError, MilvusUnavailableException, grpc.RpcError) as e:
+        # A slow or unreachable collection leaves a partial result; anything
+        # else (a bad expression, a schema mismatch) is a real error.
+        if isinstance(e, grpc.RpcError) and e.code() not in partial_search_codes:
+            raise
+        print(f"Skipping {collection.name} search: {e!r}")
+        return None
+
+def search_cache_key(term, filters):
+    return (term, search_mode(filters), use_hybrid(filters), query_flag(filters, "rerank")) + tuple(
+        filters.get(key) for key in search_filter_keys
+    )
+
+def invalidate_search_cache():
+    # Call whenever a collection is reloaded or re-indexed; cached rankings are
+    # built across all collections so every entry is stale. Lexical indexes are
+    # reopened on next use to pick up new segments.
+    lexical_indexes.clear()
+    return search_cache.invalidate()
 
-    res_pmc, res_biorxiv, res_plos = search_results
-    relevant_articles = []
+def score_pairs(pairs):
+    return resources.get("rerank_model").predict(pairs, batch_size=len(pairs))
 
-    for hits_pmc, hits_biorxiv, hits_plos in zip(res_pmc, res_biorxiv, res_plos):
-        for hit_pmc, hit_biorxiv, hit_plos in zip(hits_pmc, hits_biorxiv, hits_plos):
-            relevant_articles.extend(
-                [hit_to_dict(hit_pmc), hit_to_dict(hit_biorxiv), hit_to_dict(hit_plos)]
+# background load of the cross-encoder started by the first rerank request;
+# a failed load is retried no sooner than rerank_load_backoff seconds later
+rerank_load = {"future": None, "retry_at": 0.0}
+
+def load_rerank_model_in_background(loop):
+    if rerank_load["future"] is not None or loop.time() < rerank_load["retry_at"]:
+        return
+    future = loop.run_in_executor(rerank_executor, resources.get, "rerank_model")
+    rerank_load["future"] = future
+
+    def loaded(future):
+        rerank_load["future"] = None
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Loading rerank model failed: {future.exception()!r}, retrying in {settings.rerank_load_backoff}s")
+            rerank_load["retry_at"] = loop.time() + settings.rerank_load_backoff
+
+    future.add_done_callback(loaded)
+
+async def rerank(term, articles, deadline):
+    # Re-order the top rerank_top_k of the merged ranking with a cross-encoder.
+    # Returns False, leaving the bi-encoder order untouched, if scoring does
+    # not finish before deadline (event loop time).
+    candidates = articles.slice(0, settings.rerank_top_k)
+    if len(candidates) < 2:
+        return True
+    loop = asyncio.get_running_loop()
+    if resources.state["rerank_model"] != "ready":
+        # loading the model never counts against a request's budget
+        load_rerank_model_in_background(loop)
+        print("Rerank model not loaded yet, keeping bi-encoder order")
+        return False
+    pairs = [(term, document_text(article)) for article in candidates]
+    batch_size = settings.rerank_batch_size
+    batches = [pairs[start:start + batch_size] for start in range(0, len(pairs), batch_size)]
+    # One batch per worker at a time, checking the budget before each wave so
+    # an exhausted budget leaves at most one wave running in the background.
+    scored = []
+    for start in range(0, len(batches), settings.rerank_workers):
+        remaining = deadline - loop.time()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            scored += await asyncio.wait_for(
+                asyncio.gather(*[
+                    loop.run_in_executor(rerank_executor, score_pairs, batch)
+                    for batch in batches[start:start + settings.rerank_workers]
+                ]),
+                timeout=remaining,
             )
+        except asyncio.TimeoutError:
+            print(f"Rerank of {len(pairs)} candidates exceeded {settings.rerank_budget}s, keeping bi-encoder order")
+            return False
+    scores = np.concatenate([np.asarray(batch, dtype=np.float64).ravel() for batch in scored])
+    articles.reorder_head(np.argsort(-scores, kind="stable"))
+    return True
 
-    articles = sorted(
-        relevant_articles, key=lambda x: x["similarity_score"], reverse=True
+async def search_terms(terms, filters):
+    if matches_nothing(filters):
+        return {term: RankedResults([]) for term in terms}
+    query_embeddings = await encode_terms(terms)
+    collections = collections_for_source(filters.get("source"))
+    window = epoch_day_window(filters) if filters.get("date_filter") else None
+    expr = filter_expr(filters, window)
+    profiles = [search_profile(collection, search_mode(filters)) for collection in collections]
+
+    # One multi-vector search per collection; Milvus returns one result set
+    # per query vector, in order.
+    search_results = await asyncio.gather(
+        *[
+            search_collection(collection, query_embeddings, profile, expr)
+            for collection, profile in zip(collections, profiles)
+        ]
     )
 
-    for article in articles:
-        article["similarity_score"] = ((article["similarity_score"] + 1) / 2) * 100
-    articles = apply_filters(articles, query_params)
-    return articles
+    skipped = [str(collection.name) for collection, res in zip(collections, search_results) if res is None]
+    answered = [
+        (collection, profile, res) for collection, profile, res in zip(collections, profiles, search_results)
+        if res is not None
+    ]
+
+    async def term_hits(query_index, term):
+        collection_hits = [
+            CollectionHits.from_hits(res[query_index], output_fields(collection, profile))
+            for collection, profile, res in answered
+        ]
+        if use_hybrid(filters):
+            collection_hits = await asyncio.gather(*[
+                fuse_lexical(collection, profile, hits, term, query_embeddings[query_index])
+                for (collection, profile, _), hits in zip(answered, collection_hits)
+            ])
+        return [apply_filters(hits, filters, window) for hits in collection_hits]
+
+    # lexical fusion of every term and collection runs concurrently
+    term_results = await asyncio.gather(*[term_hits(query_index, term) for query_index, term in enumerate(terms)])
+    # one rerank budget for the whole request, however many terms it has
+    deadline = asyncio.get_running_loop().time() + settings.rerank_budget
+    results = {}
+    for term, collection_hits in zip(terms, term_results):
+        results[term] = RankedResults(collection_hits, settings.search_score_normalization, skipped)
+        complete = not skipped
+        if query_flag(filters, "rerank"):
+            complete = await rerank(term, results[term], deadline) and complete
+        # A partial result (some collection timed out, or the rerank ran out of
+        # budget) is not cached so the next request gets another chance.
+        if complete:
+            search_cache.put(search_cache_key(term, filters), results[term])
+    return results
+
+async def get_batch_data(terms, filters):
+    terms = [normalize_term(term) for term in terms]
+    results = {}
+    for term in dict.fromkeys(terms):
+        articles = search_cache.get(search_cache_key(term, filters))
+        if articles is not None:
+            results[term] = articles
+    pending = [term for term in dict.fromkeys(terms) if term not in results]
+    if pending:
+        results.update(await search_terms(pending, filters))
+    return [results[term] for term in terms]
+
+async def get_data(query_params):
+    return (await get_batch_data([query_params.get("term")], query_params))[0]
+
+async def stream_data(query_params):
+    term = normalize_term(query_params.get("term"))
+    cached = search_cache.get(search_cache_key(term, query_params))
+    if cached is not None:
+        for position in range(len(cached)):
+            yield cached.article(position)
+        return
+    if matches_nothing(query_params):
+        return
+
+    query_embeddings = await encode_terms([term])
+    collections = collections_for_source(query_params.get("source"))
+    window = epoch_day_window(query_params) if query_params.get("date_filter") else None
+    expr = filter_expr(query_params, window)
+    profiles = {collection.name: search_profile(collection, search_mode(query_params)) for collection in collections}
+    chunk_size = settings.stream_chunk_size
+    limits = {collection.name: profiles[collection.name].get("limit", 100) for collection in collections}
+
+    def fetch(collection, offset, limit):
+        return asyncio.create_task(
+            search_collection(
+                collection, query_embeddings, profiles[collection.name], expr, limit=limit, offset=offset
+            )
+        )
+
+    # Each collection is fetched in two searches: a first chunk so results
+    # start flowing, then the rest of the profile limit in one request (Milvus
+    # re-runs offset searches with topk = offset + limit, so more pages would
+    # cost more). Unseen hits of a collection can score at most its last
+    # fetched score, so anything buffered at or above the highest such bound
+    # is final and can be sent right away.
+    tasks = {
+        fetch(collection, 0, min(chunk_size, limits[collection.name])): (collection, 0)
+        for collection in collections
+    }
+    bounds = {collection.name: float("inf") for collection in collections}
+    parts = {collection.name: [] for collection in collections}
+    skipped = []
+    buffered = []
+    counter = itertools.count()
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                collection, offset = tasks.pop(task)
+                res = task.result()
+                if res is None:
+                    skipped.append(str(collection.name))
+                hits = res[0] if res is not None else []
+                if len(hits):
+                    collection_hits = CollectionHits.from_hits(
+                        hits, output_fields(collection, profiles[collection.name])
+                    )
+                    bounds[collection.name] = collection_hits.scores[-1]
+                    filtered = apply_filters(collection_hits, query_params, window)
+                    parts[collection.name].append(filtered)
+                    for row_index in range(len(filtered)):
+                        heapq.heappush(buffered, (-filtered.scores[row_index], next(counter), filtered, row_index))
+                if offset == 0 and len(hits) == chunk_size and chunk_size < limits[collection.name]:
+                    tasks[fetch(collection, chunk_size, limits[collection.name] - chunk_size)] = (collection, chunk_size)
+                else:
+                    del bounds[collection.name]
+
+            frontier = max(bounds.values(), default=float("-inf"))
+            while buffered and -buffered[0][0] >= frontier:
+                _, _, part, row_index = heapq.heappop(buffered)
+                yield part.row(row_index)
+
+        # The finished stream holds the same hits a plain search would rank,
+        # so later pages of this term are served from the cache.
+        if not skipped and not use_hybrid(query_params) and not query_flag(query_params, "rerank"):
+            collection_hits = [reduce(CollectionHits.concat, chunks) for chunks in parts.values() if chunks]
+            search_cache.put(
+                search_cache_key(term, query_params),
+                RankedResults(collection_hits, settings.search_score_normalization),
+            )
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def article_id(article):
+    for field_name in ("pmid", "bioRxiv_id", "biorxiv_id", "plos_id"):
+        if article.get(field_name) is not None:
+            return article[field_name]
+    return None
+
+def article_summary(article):
+    summary = {"id": article_id(article)}
+    for field_name in ("source", "article_title", "similarity_score", "publication_date", "publication_type"):
+        summary[field_name] = article.get(field_name)
+    return summary
+
+def paginate(articles, limit, cursor=None, view="full"):
+    # The cursor is the offset into the cached ranking, so pages stay
+    # consistent for as long as the search_cache entry lives.
+    start = int(cursor) if cursor else 0
+    if start < 0:
+        raise ValueError("cursor must not be negative")
+    page = articles.slice(start, start + limit)
+    if view == "summary":
+        page = [article_summary(article) for article in page]
+    next_cursor = str(start + limit) if start + limit < len(articles) else None
+    return page, next_cursor
 
 
 async def annotate(**ids_source):
@@ -187,7 +618,7 @@ async def annotate(**ids_source):
     }
     for source,ids in ids_source.items():
         if ids:
-            articles = articles + client.get(
+            articles = articles + resources.get("milvus").get(
                 collection_name=collections[source],
                 ids=ids
             )
@@ -198,6 +629,7 @@ async def annotate(**ids_source):
         "BioRxiv" : "bioRxiv_id",
         "Public Library of Science (PLOS)" : "plos_id"
     }
+    model = get_annotate_model()
     async def gemini_api_call_annotate(article_id, context, data):
         chat_session =  model.start_chat()
         words = context.split(" ")
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google.generativeai as genai
+from pymilvus import Collection, MilvusClient, connections
+
+from src.settings import settings
+from src.core_search.encoders import load_encoder
+
+collection_names = ["vector_data_pmc", "vector_data_biorxiv", "vector_data_plos"]
+
+
+class Resources:
+    # Expensive clients and models, built on first use or in parallel by
+    # startup() from the app lifespan. A failed build is recorded in state and
+    # retried on the next get(), so a briefly unavailable Milvus does not take
+    # the worker down.
+    def __init__(self):
+        self.factories = {}
+        self.eager = []
+        self.values = {}
+        self.locks = {}
+        self.state = {}
+        self.errors = {}
+        self.timings = {}
+
+    def register(self, name, factory, eager=True):
+        self.factories[name] = factory
+        self.locks[name] = threading.Lock()
+        self.state[name] = "pending"
+        if eager:
+            self.eager.append(name)
+
+    def get(self, name):
+        if name in self.values:
+            return self.values[name]
+        with self.locks[name]:
+            if name not in self.values:
+                self.state[name] = "loading"
+                start_time = time.perf_counter()
+                try:
+                    self.values[name] = self.factories[name]()
+                except Exception as e:
+                    self.state[name] = "failed"
+                    self.errors[name] = repr(e)
+                    raise
+                self.timings[name] = time.perf_counter() - start_time
+                self.state[name] = "ready"
+                self.errors.pop(name, None)
+        return self.values[name]
+
+    def startup(self, names=None):
+        names = names or self.eager
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="startup") as executor:
+            futures = {name: executor.submit(self.get, name) for name in names}
+        for name, future in futures.items():
+            if future.exception() is not None:
+                print(f"Failed to initialize {name}: {future.exception()!r}")
+            else:
+                print(f"Initialized {name} in {self.timings[name]:.2f}s")
+
+    @property
+    def ready(self):
+        return all(self.state[name] == "ready" for name in self.eager)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "resources": {
+                name: {
+                    "state": self.state[name],
+                    "seconds": self.timings.get(name),
+                    "error": self.errors.get(name),
+                }
+                for name in self.factories
+            },
+        }
+
+    def shutdown(self):
+        client = self.values.pop("milvus", None)
+        if client is not None:
+            client.close()
+        self.values.clear()
+        for name in self.state:
+            self.state[name] = "pending"
+
+
+def connect_milvus():
+    return MilvusClient(uri="http://" + settings.ip + ":19530")
+
+
+def milvus_alias():
+    # Collections reuse the MilvusClient's own connection instead of opening
+    # a second one.
+    client = resources.get("milvus")
+    alias = getattr(client, "_using", None)
+    if alias is None:
+        connections.connect(host=settings.ip, port="19530")
+        alias = "default"
+    return alias
+
+
+def configure_gemini():
+    genai.configure(api_key=settings.gemini_api_key)
+    return genai
+
+
+# Configured GenerativeModel instances, one per (model, config, system
+# instruction, safety settings), reused across requests together with the
+# API clients they hold.
+generative_models = {}
+generative_models_lock = threading.Lock()
+
+
+def get_generative_model(model_name, generation_config, system_instruction=None, safety_settings=None):
+    key = (
+        model_name,
+        json.dumps(generation_config, sort_keys=True),
+        system_instruction,
+        json.dumps(safety_settings, sort_keys=True),
+    )
+    model = generative_models.get(key)
+    if model is None:
+        resources.get("gemini")
+        with generative_models_lock:
+            model = generative_models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config,
+                    system_instruction=system_instruction,
+                    safety_settings=safety_settings,
+                )
+                generative_models[key] = model
+    return model
+
+
+resources = Resources()
+resources.register("milvus", connect_milvus)
+for collection_name in collection_names:
+    resources.register(
+        collection_name,
+        lambda collection_name=collection_name: Collection(name=collection_name, using=milvus_alias()),
+    )
+resources.register(
+    "sbert_model",
+    lambda: load_encoder(
+        settings.encoder_backend, settings.encoder_model, settings.encoder_threads, settings.encoder_onnx_file
+    ),
+)
+resources.register("gemini", configure_gemini)
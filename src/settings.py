@@ -8,6 +8,74 @@ class Settings(BaseSettings):
     debug_mode: bool = False 
     ip: str
     gemini_api_key : str
+    encode_workers: int = 2
+    encoder_model: str = "all-MiniLM-L6-v2"
+    # "torch" (SentenceTransformer) or "onnx" (ONNX Runtime, int8 by default)
+    encoder_backend: str = "torch"
+    encoder_onnx_file: str = "onnx/model_quint8_avx2.onnx"
+    # intra-op threads per encode; 0 leaves the library default
+    encoder_threads: int = 0
+    # concurrent queries are coalesced into one encode for up to this long
+    encode_batch_wait_ms: float = 2.0
+    encode_max_batch: int = 64
+    search_workers: int = 12
+    warmup_enabled: bool = True
+    search_timeout: float = 5.0
+    # extra time a multi-vector search gets for each query vector beyond the first
+    search_timeout_per_query: float = 0.1
+    embedding_cache_size: int = 10000
+    embedding_cache_bytes: int = 64 * 1024 * 1024
+    embedding_cache_ttl: float = 24 * 60 * 60
+    search_cache_size: int = 1000
+    search_cache_bytes: int = 256 * 1024 * 1024
+    search_cache_ttl: float = 5 * 60
+    search_page_size: int = 20
+    search_score_normalization: str = "none"
+    batch_search_max_terms: int = 200
+    stream_chunk_size: int = 25
+    search_default_mode: str = "accurate"
+    lexical_index_dir: str = "indexes/lexical"
+    lexical_search_limit: int = 100
+    rrf_k: int = 60
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_top_k: int = 50
+    rerank_batch_size: int = 16
+    rerank_workers: int = 2
+    rerank_budget: float = 0.5
+    # seconds to wait before retrying a failed cross-encoder load
+    rerank_load_backoff: float = 60.0
+    # load the cross-encoder during warm-up; enable where clients send rerank=true
+    rerank_warmup: bool = False
+    article_cache_size: int = 5000
+    article_cache_bytes: int = 256 * 1024 * 1024
+    article_cache_ttl: float = 60 * 60
+    batch_article_max: int = 100
+    # article Q&A prompt budgets, in estimated tokens
+    article_token_budget: int = 6000
+    # all-MiniLM-L6-v2 reads at most 256 tokens, so chunks stay under ~1000 chars
+    article_chunk_chars: int = 1000
+    article_top_k_chunks: int = 6
+    chunk_cache_size: int = 2000
+    chunk_cache_bytes: int = 128 * 1024 * 1024
+    # first-turn answers reused for questions at least this similar
+    answer_cache_threshold: float = 0.92
+    answer_cache_size: int = 5000
+    answer_cache_per_article: int = 20
+    answer_cache_ttl: float = 24 * 60 * 60
+    history_token_budget: int = 4000
+    history_summary_chars: int = 200
+    # mode -> collection name (or "default") -> Collection.search settings:
+    # metric_type, params (nprobe for IVF, ef for HNSW), limit,
+    # consistency_level and optionally output_fields
+    search_profiles: dict = {
+        "accurate": {
+            "default": {"metric_type": "COSINE", "params": {"nprobe": 10}, "limit": 100},
+        },
+        "fast": {
+            "default": {"metric_type": "COSINE", "params": {"nprobe": 4}, "limit": 50},
+            "vector_data_pmc": {"params": {"nprobe": 2}},
+        },
+    }
 
     class Config:
         env_file = ".env" 
@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.settings import settings
+from src.core_search.cache import LRUCache
+
+# (source, id) -> [(question embedding, answer), ...] for first-turn questions,
+# so near-identical questions about a popular article skip the LLM call.
+answer_cache = LRUCache(
+    max_entries=settings.answer_cache_size,
+    ttl=settings.answer_cache_ttl,
+)
+
+
+def cached_answer(id, source, query_embedding):
+    entries = answer_cache.get((source, str(id)))
+    if not entries:
+        return None
+    embeddings = np.vstack([embedding for embedding, _ in entries])
+    norms = np.clip(np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding), 1e-12, None)
+    similarity = embeddings @ query_embedding / norms
+    best = int(np.argmax(similarity))
+    if similarity[best] < settings.answer_cache_threshold:
+        return None
+    return entries[best][1]
+
+
+def store_answer(id, source, query_embedding, answer):
+    answer_cache.update(
+        (source, str(id)),
+        lambda entries: (list(entries or []) + [(query_embedding, answer)])[-settings.answer_cache_per_article:],
+    )
@@ -0,0 +1,47 @@
+import asyncio
+
+import numpy as np
+
+from src.settings import settings
+from src.core_search.cache import LRUCache
+from src.core_search.utils import encode_terms, get_sbert_model, normalize_term
+from src.view_article.history import article_chunks
+
+# (source, id) -> (chunks, chunk embeddings), built the first time a question
+# is asked about the article and reused by every later question.
+chunk_cache = LRUCache(
+    max_entries=settings.chunk_cache_size,
+    max_bytes=settings.chunk_cache_bytes,
+    ttl=settings.article_cache_ttl,
+    sizeof=lambda entry: entry[1].nbytes + sum(len(chunk) for chunk in entry[0]),
+)
+
+
+def encode_chunks(chunks):
+    # Whole articles are encoded off the query encode pool, in slices of
+    # encode_max_batch, so a long paper does not hold up concurrent searches.
+    model = get_sbert_model()
+    batch_size = settings.encode_max_batch
+    return np.vstack([model.encode(chunks[start:start + batch_size]) for start in range(0, len(chunks), batch_size)])
+
+
+async def chunk_index(id, source, article):
+    key = (source, str(id))
+    entry = chunk_cache.get(key)
+    if entry is None:
+        chunks = article_chunks(article)
+        embeddings = await asyncio.to_thread(encode_chunks, chunks) if chunks else np.empty((0, 0), dtype=np.float32)
+        entry = (chunks, embeddings)
+        chunk_cache.put(key, entry)
+    return entry
+
+
+async def rank_passages(id, source, article, question):
+    # the article's cached chunks and the indices of those most similar to the
+    # question, best first, limited to the top article_top_k_chunks
+    chunks, embeddings = await chunk_index(id, source, article)
+    if not chunks:
+        return chunks, []
+    query = (await encode_terms([normalize_term(question)]))[0]
+    similarity = embeddings @ query / np.clip(np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query), 1e-12, None)
+    return chunks, np.argsort(-similarity, kind="stable")[:settings.article_top_k_chunks].tolist()
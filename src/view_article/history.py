@@ -0,0 +1,108 @@
+import json
+import re
+
+from src.settings import settings
+
+sentence_end = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English prose; cheap and good enough for
+    # keeping prompts under a budget
+    return len(text) // 4 + 1
+
+
+def as_text(value):
+    if not value:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def turn_text(turn):
+    return " ".join(str(part) for part in turn.get("parts", []))
+
+
+def chunk_text(text, chunk_chars):
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n|\\n\\n", text):
+        paragraph = " ".join(paragraph.split())
+        if len(paragraph) > chunk_chars:
+            # flush first so an oversized paragraph stays in article order
+            if current:
+                chunks.append(current)
+                current = ""
+            while len(paragraph) > chunk_chars:
+                chunks.append(paragraph[:chunk_chars])
+                paragraph = paragraph[chunk_chars:]
+        if current and len(current) + len(paragraph) + 1 > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {paragraph}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def article_chunks(article):
+    return chunk_text(as_text(article.get("body_content")), settings.article_chunk_chars)
+
+
+def select_passages(chunks, ranking, budget):
+    # best ranked chunks that fit the budget, sent back in article order
+    selected, used = [], 0
+    for index in ranking:
+        cost = estimate_tokens(chunks[index])
+        if used + cost > budget:
+            continue
+        selected.append(index)
+        used += cost
+    return [chunks[index] for index in sorted(selected)]
+
+
+def article_context(article, chunks, ranking, budget=None):
+    # ranking indexes into chunks; pass both from the same chunk_cache entry
+    budget = budget or settings.article_token_budget
+    abstract = as_text(article.get("abstract_content"))
+    title = as_text(article.get("article_title"))
+    header = "\n".join(part for part in (title, abstract) if part)
+    passages = select_passages(chunks, ranking, budget - estimate_tokens(header))
+    return header + "\n\n" + "\n\n".join(passages)
+
+
+def summarize_turns(turns, budget):
+    # extractive summary: the opening sentence of every older turn, newest
+    # kept if the whole thing does not fit
+    lines = []
+    for turn in turns:
+        text = " ".join(turn_text(turn).split())
+        first_sentence = sentence_end.split(text, 1)[0][:settings.history_summary_chars]
+        lines.append(f"{turn.get('role', 'user')}: {first_sentence}")
+    summary = "\n".join(lines)
+    max_chars = max(budget, 0) * 4
+    return summary[-max_chars:] if max_chars else ""
+
+
+def budget_history(history, budget=None):
+    # Recent turns verbatim while they fit ~3/4 of the budget, everything
+    # older folded into one summary exchange.
+    budget = budget or settings.history_token_budget
+    verbatim_budget = budget * 3 // 4
+    kept, used = [], 0
+    for turn in reversed(history):
+        cost = estimate_tokens(turn_text(turn))
+        if used + cost > verbatim_budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    # Gemini expects the history to start with a user turn
+    while kept and kept[0].get("role") != "user":
+        kept.pop(0)
+    older = history[:len(history) - len(kept)]
+    if not older:
+        return kept
+    summary = summarize_turns(older, budget - used)
+    return [
+        {"role": "user", "parts": ["Summary of our earlier conversation about this article:\n" + summary]},
+        {"role": "model", "parts": ["Noted, I will take that earlier conversation into account."]},
+    ] + kept
@@ -1,9 +1,10 @@
 from fastapi import FastAPI, Request, Response, APIRouter, status
 from fastapi.responses import StreamingResponse, JSONResponse
-from typing import Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 from src.view_article import utils
 from src.settings import settings
+import asyncio
 import boto3
 from datetime import datetime
 from src.database.connections import connections
@@ -17,10 +18,50 @@ class QuestionRequest(BaseModel):
     source: str
     article_id: int
 
+class ArticleRef(BaseModel):
+    source: str
+    id: Union[int, str]
+
+class BatchArticleRequest(BaseModel):
+    articles: List[ArticleRef]
+
+@router.post("/get_articles")
+async def get_articles(request: BatchArticleRequest):
+    if len(request.articles) > settings.batch_article_max:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"status": "error", "message": f"At most {settings.batch_article_max} articles per request."}
+        )
+    unknown = sorted({ref.source for ref in request.articles if ref.source not in utils.collections})
+    if unknown:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"status": "error", "message": f"Unknown source(s): {', '.join(unknown)}."}
+        )
+
+    refs = [(ref.source, ref.id) for ref in request.articles]
+    response = await utils.get_articles(refs)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "status" : "success",
+            "articles" : [
+                {"source": source, "id": id, "found": article is not None, "article": article}
+                for (source, id), article in zip(refs, response)
+            ]
+            }
+    )
+
 @router.get("/get_article/{article_id}")
 async def get_article(article_id : str, source : str):
     
     response  = await utils.get_article(article_id,source)
+    if response is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"status": "error", "message": f"Article {article_id} not found in {source}."}
+        )
     
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -38,7 +79,7 @@ async def get_answer(request: QuestionRequest):
     article_id = request.article_id
     user_id = request.user_id
     
-    user_response = connections.users_table.get_item(Key={'user_id': user_id})
+    user_response = await asyncio.to_thread(connections.users_table.get_item, Key={'user_id': user_id})
     if 'Item' not in user_response:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -52,7 +93,8 @@ async def get_answer(request: QuestionRequest):
         session_id = utils.create_session()
         session_title = f"{question[:100]}"  # Limit title to 100 characters
         history_sessions.append({'session_id': session_id, 'session_title': session_title})
-        connections.users_table.update_item(
+        await asyncio.to_thread(
+            connections.users_table.update_item,
             Key={'user_id': user_id},
             UpdateExpression="SET history_sessions = :history_sessions",
             ExpressionAttributeValues={':history_sessions': history_sessions}
@@ -60,7 +102,9 @@ async def get_answer(request: QuestionRequest):
         
     timestamp = datetime.now().strftime("%d-%m-%Y %H:%M")
 
-    history = connections.history_table.get_item(Key={'user_id': user_id, 'session_id': session_id})
+    history = await asyncio.to_thread(
+        connections.history_table.get_item, Key={'user_id': user_id, 'session_id': session_id}
+    )
     history = history.get('Item', {})
     session_title = history.get("session_title",question)
     previous_conversations = history.get('conversation',[])
@@ -68,14 +112,15 @@ async def get_answer(request: QuestionRequest):
     response_generator = utils.answer_query(question, article_id, session_id, source, previous_conversations)
     
     async def stream_response():
-        for response in response_generator:
+        async for response in response_generator:
             print(type(response))
             if isinstance(response,bytes):
                 print("yes")
                 yield response
             last_response = response
         print(last_response)
-        connections.history_table.put_item(
+        await asyncio.to_thread(
+            connections.history_table.put_item,
             Item={
                 'user_id': user_id,
                 'session_id': session_id,
@@ -1,16 +1,18 @@
+import asyncio
 import json
-from pymilvus import MilvusClient, Collection, connections, MilvusException
+from pymilvus import MilvusException
 import time
 import gc
 from src.settings import settings
 from src.core_search.publication_categories import publication_categories 
-import google.generativeai as genai
 import uuid
 from src.database.connections import connections
-
-vector_data_pmc = Collection(name="vector_data_pmc")
-vector_data_biorxiv = Collection(name="vector_data_biorxiv")
-vector_data_plos = Collection(name="vector_data_plos")
+from src.resources import resources, get_generative_model
+from src.core_search.cache import LRUCache
+from src.view_article.history import article_context, budget_history
+from src.view_article.chunks import rank_passages
+from src.view_article.answers import cached_answer, store_answer
+from src.core_search.utils import encode_terms, normalize_term
 
 collections  = {
         "pubmed" : "vector_data_pmc",
@@ -18,56 +20,138 @@ collections  = {
         "plos": "vector_data_plos"
     }
 
+# Full articles by (source, id), shared by get_article and answer_query and
+# bounded by the size of their JSON encoding.
+article_cache = LRUCache(
+    max_entries=settings.article_cache_size,
+    max_bytes=settings.article_cache_bytes,
+    ttl=settings.article_cache_ttl,
+    sizeof=lambda article: len(json.dumps(article)),
+)
+article_fields = {}
+
+def get_article_fields(collection_name):
+    # every scalar field, so the embedding never crosses the wire
+    if collection_name not in article_fields:
+        schema = resources.get(collection_name).schema
+        article_fields[collection_name] = [
+            field.name for field in schema.fields if "VECTOR" not in field.dtype.name
+        ]
+    return article_fields[collection_name]
+
+def get_rows(collection_name, ids):
+    return connections.milvus_client.get(
+        collection_name=collection_name,
+        ids=ids,
+        output_fields=get_article_fields(collection_name)
+    )
+
+def fetch_article(id, source):
+    key = (source, str(id))
+    article = article_cache.get(key)
+    if article is None:
+        articles = get_rows(collections[source], [id])
+        if not articles:
+            return None
+        article = articles[0]
+        article_cache.put(key, article)
+    return article
+
+def fetch_source_articles(source, ids):
+    collection_name = collections[source]
+    primary_field = resources.get(collection_name).schema.primary_field.name
+    articles = {}
+    for article in get_rows(collection_name, ids):
+        key = (source, str(article[primary_field]))
+        article_cache.put(key, article)
+        articles[key] = article
+    return articles
+
+generation_config = {
+    "temperature": 0.5,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 8192,
+    "response_mime_type": "text/plain",
+    }
+system_instruction = "Think yourself as an research assistant.You will receieve data related to life sciences.Analyze it and answer only if a valid question is asked after that"
+
 def create_session():
     return str(uuid.uuid4())
 
-def answer_query(question,id,session_id,source,history):
-    context = ''
+async def answer_query(question,id,session_id,source,history):
+    # Every turn gets the passages of the article relevant to this question
+    # and a token-budgeted view of the conversation, so prompt size stays flat
+    # as the session grows. The stored conversation keeps the plain questions.
+    query_embedding = None
     if len(history) == 0:
-        article = connections.milvus_client.get(
-        collection_name=collections[source],
-        ids=[id]
-        )  
-        context = json.dumps(article[0]['body_content'])  + json.dumps(article[0]['abstract_content'])
+        query_embedding = (await encode_terms([normalize_term(question)]))[0]
+        # a near-identical first question about this article was answered
+        # already; replay it in the same chunk format without calling Gemini
+        cached = cached_answer(id, source, query_embedding)
+        if cached is not None:
+            temp = {
+                "session_id" : session_id,
+                "answer" : cached
+            }
+            yield json.dumps(temp).encode("utf-8")
+            yield [
+                {"role": "user", "parts": [question]},
+                {"role": "model", "parts": [cached]},
+            ]
+            return
+
+    article = await asyncio.to_thread(fetch_article, id, source)
+    chunks, ranking = await rank_passages(id, source, article, question)
+    context = article_context(article, chunks, ranking)
     prompt = context +"\n\n" +  question
-    generation_config = {
-        "temperature": 0.5,
-        "top_p": 0.95,
-        "top_k": 64,
-        "max_output_tokens": 8192,
-        "response_mime_type": "text/plain",
-        }
-    model = genai.GenerativeModel(
-        model_name="gemini-1.5-flash",
-        generation_config=generation_config,
-        system_instruction="Think yourself as an research assistant.You will receieve data related to life sciences.Analyze it and answer only if a valid question is asked after that",
-        safety_settings="BLOCK_NONE",
+    model = get_generative_model(
+        "gemini-1.5-flash", generation_config, system_instruction, safety_settings="BLOCK_NONE"
     )
     chat_session = model.start_chat(
-        history=history
+        history=budget_history(history)
     )
 
-    response = chat_session.send_message(prompt,stream=True)
-    for chunk in response:
+    # the async client awaits each streamed chunk instead of blocking the
+    # event loop between tokens
+    response = await chat_session.send_message_async(prompt,stream=True)
+    answer = []
+    async for chunk in response:
+        answer.append(chunk.text)
         temp = {
             "session_id" : session_id,
             "answer" : chunk.text
         }
         temp = json.dumps(temp)
         yield temp.encode("utf-8")
-    history = []
-    for i in chat_session.history:
-          temp = {}
-          temp["role"] = i.role
-          temp["parts"] = [part.text for part in i.parts]
-          history.append(temp)
-    yield history
+    if query_embedding is not None and answer:
+        store_answer(id, source, query_embedding, "".join(answer))
+    yield list(history) + [
+        {"role": "user", "parts": [question]},
+        {"role": "model", "parts": ["".join(answer)]},
+    ]
     
+async def get_articles(refs):
+    # refs are (source, id) pairs; one Milvus get per source for the ids that
+    # are not cached, with the sources fetched concurrently
+    found = {}
+    missing = {}
+    for source, id in refs:
+        key = (source, str(id))
+        if key in found:
+            continue
+        article = article_cache.get(key)
+        if article is not None:
+            found[key] = article
+        else:
+            missing.setdefault(source, {})[key] = id
+    fetched = await asyncio.gather(*[
+        asyncio.to_thread(fetch_source_articles, source, list(ids.values()))
+        for source, ids in missing.items()
+    ])
+    for articles in fetched:
+        found.update(articles)
+    return [found.get((source, str(id))) for source, id in refs]
+
 async def get_article(id,source):
-    article = connections.milvus_client.get(
-    collection_name=collections[source],
-    ids=[id]
-    )  
-    article = article[0]
-    article.pop('vector_data')
-    return article
\ No newline at end of file
+    return await asyncio.to_thread(fetch_article, id, source)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from src.core_search.encoders import TorchEncoder, agreement, load_encoder
+from src.settings import settings
+
+sentences = [
+    "cancer immunotherapy",
+    "BRCA1 mutation",
+    "covid-19 vaccine efficacy",
+    "gut microbiome",
+    "CRISPR-Cas9 off-target effects in human cells",
+    "single-cell RNA sequencing of tumour microenvironment",
+    "tau protein aggregation in Alzheimer's disease",
+    "p53",
+]
+
+
+def test_onnx_encoder_agrees_with_torch():
+    reference = TorchEncoder(settings.encoder_model)
+    candidate = load_encoder("onnx", settings.encoder_model, onnx_file=settings.encoder_onnx_file)
+    assert agreement(reference, candidate, sentences).min() >= 0.99